@@ -102,6 +102,7 @@ except Exception:
 
 # Pre-compiled regex patterns for performance
 _API_KEY_REDACTION = "[CHATADS_API_KEY]"
+_URL_QUERY_PATTERN = re.compile(r"(https?://[^\s?]+)\?[^\s]+")
 
 # FunctionItem field handling - optional fields per OpenAPI spec (plus message)
 _FIELD_NORMALIZE = {
@@ -137,6 +138,23 @@ def set_metric_callback(callback: Callable[[str, float, Dict[str, str]], None])
     _metric_callback = callback
 
 
+async def aclose_cached_clients() -> None:
+    """
+    Close every pooled HTTP client and empty the connection cache.
+
+    Call once at application shutdown (e.g. before the event loop exits) so keep-alive
+    connections shared across requests are released cleanly.
+    """
+    with _http_client_cache_lock:
+        clients = list(_http_client_cache.values())
+        _http_client_cache.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as exc:
+            LOGGER.warning("Failed to close cached client: %s", exc)
+
+
 def _emit_metric(metric_name: str, value: float, tags: Optional[Dict[str, str]] = None) -> None:
     """Emit metric if callback is configured."""
     if _metric_callback:
@@ -514,7 +532,7 @@ def _sanitize_error_for_logging(error: Exception, api_key: Optional[str] = None)
     if "x-api-key" in lowered or "authorization" in lowered:
         return "Request error (details redacted for security)"
     if "http" in lowered:
-        error_str = re.sub(r"(https?://[^\s?]+)\?[^\s]+", r"\1", error_str)
+        error_str = _URL_QUERY_PATTERN.sub(r"\1", error_str)
     return error_str
 
 
@@ -6,8 +6,9 @@ Coverage: pytest test_chatads_mcp_wrapper.py --cov=chatads_mcp_wrapper --cov-rep
 """
 
 import os
+import re
+import time
 from types import SimpleNamespace
-from unittest.mock import AsyncMock, Mock, patch
 
 import httpx
 import pytest
@@ -30,17 +31,200 @@ from chatads_mcp_wrapper import (
     _sanitize_error_for_logging,
     _summarize_usage,
     _validate_inputs,
+    aclose_cached_clients,
     normalize_envelope,
+    run_chatads_message_send,
 )
 
-
-@pytest.fixture(autouse=True)
-def reset_client_state():
-    """Ensure HTTP client cache/circuit breaker do not leak between tests."""
+# Requests are intercepted at the httpx transport level (pytest-httpx), so the
+# real AsyncClient code path runs without touching the network.
+API_URL = f"{chatads_module.DEFAULT_BASE_URL}{chatads_module.DEFAULT_ENDPOINT}"
+
+MOCK_API_KEY = "mock_api_key_test1234567890abcdef"
+
+# Long inputs are built once per module rather than inside each test body.
+_MSG_LARGE_PAYLOAD = "word " * 400  # ~2000 chars (within limit)
+
+# Exact client-side error messages, compared with == rather than substring checks.
+_EXPECTED_MSG_EMPTY_MESSAGE = "Message cannot be empty."
+_EXPECTED_MSG_NO_API_KEY = "No ChatAds API key provided. Set CHATADS_API_KEY or pass `api_key`."
+_EXPECTED_MSG_CLIENT_NO_API_KEY = "Missing ChatAds API key. Set CHATADS_API_KEY or pass api_key parameter."
+_EXPECTED_MSG_RETRYABLE = "ChatAds returned a retryable error."
+
+# Canonical API envelopes shared by the end-to-end tests. httpx serializes
+# them into each mocked response body, so tests never see the same object.
+_SUCCESS_MATCH_PAYLOAD = {
+    "data": {
+        "status": "filled",
+        "offers": [
+            {
+                "link_text": "laptop",
+                "url": "https://amazon.com/macbook-pro",
+                "confidence_level": "high",
+                "product": {
+                    "title": "MacBook Pro M3",
+                    "description": "Perfect for developers!",
+                },
+            }
+        ],
+        "requested": 1,
+        "returned": 1,
+    },
+    "error": None,
+    "meta": {
+        "request_id": "req_abc123",
+        "country": "US",
+        "usage": {
+            "monthly_requests": 10,
+            "free_tier_limit": 1000,
+            "free_tier_remaining": 990,
+            "daily_requests": 5,
+            "daily_limit": 100,
+            "is_free_tier": True,
+        },
+    },
+}
+
+_NO_MATCH_PAYLOAD = {
+    "data": {
+        "status": "no_offers_found",
+        "offers": [],
+        "requested": 1,
+        "returned": 0,
+    },
+    "error": None,
+    "meta": {"request_id": "req_xyz789"},
+}
+
+_QUOTA_EXCEEDED_PAYLOAD = {
+    "data": None,
+    "error": {
+        "code": "QUOTA_EXCEEDED",
+        "message": "Monthly quota reached",
+    },
+    "meta": {"request_id": "req_quota123"},
+}
+
+_FORBIDDEN_PAYLOAD = {
+    "data": None,
+    "error": {
+        "code": "FORBIDDEN",
+        "message": "Invalid API key",
+    },
+    "meta": {"request_id": "req_forbidden"},
+}
+
+_INTERNAL_ERROR_PAYLOAD = {"data": None, "error": {"code": "INTERNAL_ERROR", "message": "Internal Server Error"}}
+
+# Minimal 200 body for client-level fetch tests that do not inspect the envelope.
+_EMPTY_OK_PAYLOAD = {"data": {}, "error": None}
+
+
+@pytest.fixture
+async def _reset_client_state(_http_client_pool):
+    """Ensure HTTP client cache/circuit breaker do not leak between tests that build clients.
+
+    State is cleared on both entry and exit so that, under pytest-xdist, whichever
+    test a worker runs next starts from a clean module regardless of ordering.
+    Clients a test built outside the session pool are closed on the way out;
+    pooled ones stay open for the next test.
+    """
+    chatads_module._http_client_cache.clear()
+    ChatAdsClient._circuit_breaker = None
+    yield
+    pooled = {id(http_client) for http_client in _http_client_pool.values()}
+    for http_client in chatads_module._http_client_cache.values():
+        if id(http_client) not in pooled:
+            await http_client.aclose()
     chatads_module._http_client_cache.clear()
     ChatAdsClient._circuit_breaker = None
 
 
+@pytest.fixture(scope="class")
+def _api_key_env():
+    """Set CHATADS_API_KEY once per class, restoring the previous value afterwards."""
+    previous = os.environ.get("CHATADS_API_KEY")
+    os.environ["CHATADS_API_KEY"] = MOCK_API_KEY
+    yield
+    if previous is None:
+        os.environ.pop("CHATADS_API_KEY", None)
+    else:
+        os.environ["CHATADS_API_KEY"] = previous
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Drive CircuitBreaker timeouts from a manual clock instead of real sleeps.
+
+    Only the wrapper's reference to ``time`` is swapped, so pytest's own timing is untouched.
+    """
+    clock = SimpleNamespace(now=1_000.0)
+    monkeypatch.setattr(
+        chatads_module,
+        "time",
+        SimpleNamespace(time=lambda: clock.now, perf_counter=time.perf_counter),
+    )
+    return clock
+
+
+@pytest.fixture
+def sleep_calls(monkeypatch):
+    """Record retry backoff delays instead of sleeping.
+
+    A plain coroutine is enough here; it skips AsyncMock's per-call bookkeeping.
+    """
+    delays = []
+
+    async def fake_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+
+    monkeypatch.setattr(chatads_module.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+@pytest.fixture(scope="session")
+async def _http_client_pool():
+    """httpx.AsyncClient instances shared by every test that uses client_factory.
+
+    Created and closed on the session-wide event loop the async tests also run on.
+    """
+    pool = {}
+    yield pool
+    for http_client in pool.values():
+        await http_client.aclose()
+
+
+@pytest.fixture
+def client_factory(_reset_client_state, _http_client_pool):
+    """Build ChatAdsClient instances on top of session-wide pooled httpx clients.
+
+    Each test still gets a fresh ChatAdsClient (and circuit breaker); only the
+    underlying AsyncClient is reused, by seeding the wrapper's own client cache.
+    """
+
+    def make(api_key, config=None):
+        config = config or ChatAdsClientConfig()
+        cache_key = f"{api_key}:{config.base_url}"
+        pool_key = (cache_key, config.timeout)
+        if pool_key in _http_client_pool:
+            chatads_module._http_client_cache[cache_key] = _http_client_pool[pool_key]
+        client = ChatAdsClient(api_key, config)
+        _http_client_pool.setdefault(pool_key, client._client)
+        return client
+
+    return make
+
+
+@pytest.fixture
+def _pooled_default_client(client_factory):
+    """Seed the client cache so run_chatads_message_send reuses the pooled AsyncClient.
+
+    The tool builds ChatAdsClient(MOCK_API_KEY) with the default config, which hits
+    the same cache key as this client.
+    """
+    client_factory(MOCK_API_KEY)
+
+
 class TestSanitization:
     """Test error message sanitization to prevent data leaks."""
 
@@ -48,8 +232,7 @@ class TestSanitization:
         api_key = "my-secret-api-key"
         error = Exception(f"Failed with key {api_key}")
         result = _sanitize_error_for_logging(error, api_key=api_key)
-        assert _API_KEY_REDACTION in result
-        assert api_key not in result
+        assert result == f"Failed with key {_API_KEY_REDACTION}"
 
     def test_sanitize_api_key_header(self):
         error = Exception("Request failed with x-api-key: some_key")
@@ -61,6 +244,14 @@ class TestSanitization:
         result = _sanitize_error_for_logging(error)
         assert result == "Request error (details redacted for security)"
 
+    def test_sanitize_strips_url_query_string(self):
+        error = Exception("GET https://api.example.com/v1/messages?token=abc failed")
+        result = _sanitize_error_for_logging(error)
+        assert result == "GET https://api.example.com/v1/messages failed"
+
+    def test_url_pattern_is_precompiled_at_module_level(self):
+        assert isinstance(chatads_module._URL_QUERY_PATTERN, re.Pattern)
+
     def test_sanitize_safe_error(self):
         error = Exception("Connection timeout")
         result = _sanitize_error_for_logging(error)
@@ -74,22 +265,29 @@ class TestInputValidation:
     that message is non-empty. API key validation is handled by _resolve_api_key.
     """
 
-    def test_valid_inputs(self):
-        _validate_inputs(message="best laptop for coding")
-
-    def test_valid_inputs_minimal(self):
-        _validate_inputs(message="test message")
-
-    def test_empty_message(self):
+    @pytest.mark.parametrize(
+        "message",
+        [
+            pytest.param("best laptop for coding", id="typical"),
+            pytest.param("test message", id="minimal"),
+        ],
+    )
+    def test_valid_inputs(self, message):
+        _validate_inputs(message=message)
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            pytest.param("", id="empty_message"),
+            pytest.param("   ", id="whitespace_only_message"),
+            pytest.param(None, id="none_message"),
+        ],
+    )
+    def test_invalid_inputs(self, message):
         with pytest.raises(ChatAdsAPIError) as exc_info:
-            _validate_inputs("")
-        assert exc_info.value.code == "INVALID_INPUT"
-        assert "empty" in str(exc_info.value).lower()
-
-    def test_whitespace_only_message(self):
-        with pytest.raises(ChatAdsAPIError) as exc_info:
-            _validate_inputs("   ")
+            _validate_inputs(message)
         assert exc_info.value.code == "INVALID_INPUT"
+        assert exc_info.value.args[0] == _EXPECTED_MSG_EMPTY_MESSAGE
 
 
 class TestReasonNormalization:
@@ -179,6 +377,7 @@ class TestAPIKeyResolution:
         with pytest.raises(ChatAdsAPIError) as exc_info:
             _resolve_api_key(None)
         assert exc_info.value.code == "CONFIGURATION_ERROR"
+        assert exc_info.value.args[0] == _EXPECTED_MSG_NO_API_KEY
 
 
 class TestMetadataBuilding:
@@ -275,6 +474,7 @@ class TestEnvelopeNormalization:
         assert result.error_code == "QUOTA_EXCEEDED"
 
 
+@pytest.mark.usefixtures("_reset_client_state")
 class TestChatAdsClient:
     """Test HTTP client with retry logic."""
 
@@ -282,110 +482,90 @@ class TestChatAdsClient:
         with pytest.raises(ChatAdsAPIError) as exc_info:
             ChatAdsClient("")
         assert exc_info.value.code == "CONFIGURATION_ERROR"
+        assert exc_info.value.args[0] == _EXPECTED_MSG_CLIENT_NO_API_KEY
 
     def test_client_initialization_with_api_key(self):
         client = ChatAdsClient("mock_api_key_test")
         assert client._client.headers["x-api-key"] == "mock_api_key_test"
         assert hasattr(client, "aclose")
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_fetch_success(self, mock_client_class):
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"data": {}, "error": None}
+    async def test_aclose_cached_clients_empties_pool(self):
+        client = ChatAdsClient("mock_api_key_test")
+        assert chatads_module._http_client_cache
+
+        await aclose_cached_clients()
+
+        assert chatads_module._http_client_cache == {}
+        assert client._client.is_closed
 
-        mock_client = AsyncMock()
-        mock_client.post.return_value = mock_response
-        mock_client_class.return_value = mock_client
+    async def test_fetch_success(self, httpx_mock, client_factory):
+        httpx_mock.add_response(method="POST", url=API_URL, json=_EMPTY_OK_PAYLOAD)
 
         config = ChatAdsClientConfig(max_retries=3)
-        client = ChatAdsClient("mock_api_key_123", config)
+        client = client_factory("mock_api_key_123", config)
         data, status_code, latency_ms = await client.fetch({"message": "test"})
 
-        assert data == {"data": {}, "error": None}
+        assert data == _EMPTY_OK_PAYLOAD
         assert status_code == 200
         assert latency_ms > 0
         await client.aclose()
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_fetch_retries_on_timeout(self, mock_client_class):
-        mock_client = AsyncMock()
-        mock_client.post.side_effect = [
-            httpx.TimeoutException("Timeout"),
-            httpx.TimeoutException("Timeout"),
-        ]
-        mock_client_class.return_value = mock_client
+    async def test_fetch_retries_on_timeout(self, httpx_mock, client_factory):
+        httpx_mock.add_exception(httpx.TimeoutException("Timeout"), url=API_URL)
+        httpx_mock.add_exception(httpx.TimeoutException("Timeout"), url=API_URL)
 
         config = ChatAdsClientConfig(max_retries=2, backoff_seconds=0.0)
-        client = ChatAdsClient("mock_api_key_123", config)
+        client = client_factory("mock_api_key_123", config)
 
         with pytest.raises(ChatAdsAPIError) as exc_info:
             await client.fetch({"message": "test"})
 
         assert exc_info.value.code == "UPSTREAM_UNAVAILABLE"
-        assert mock_client.post.call_count == 2
-
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_fetch_retries_on_500_error(self, mock_client_class):
-        mock_response = Mock()
-        mock_response.status_code = 500
-        mock_response.json.return_value = {"error": "Internal server error"}
+        assert len(httpx_mock.get_requests()) == 2
 
-        mock_client = AsyncMock()
-        mock_client.post.side_effect = [mock_response, mock_response, mock_response]
-        mock_client_class.return_value = mock_client
+    async def test_fetch_retries_on_500_error(self, httpx_mock, client_factory):
+        httpx_mock.add_response(url=API_URL, status_code=500, json=_INTERNAL_ERROR_PAYLOAD, is_reusable=True)
 
         config = ChatAdsClientConfig(max_retries=2, backoff_seconds=0.0)
-        client = ChatAdsClient("mock_api_key_123", config)
+        client = client_factory("mock_api_key_123", config)
 
         with pytest.raises(ChatAdsAPIError) as exc_info:
             await client.fetch({"message": "test"})
 
         assert exc_info.value.code == "UPSTREAM_UNAVAILABLE"
-        assert mock_client.post.call_count == 2
+        assert len(httpx_mock.get_requests()) == 2
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.asyncio.sleep", new_callable=AsyncMock)
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_fetch_500_retries_use_backoff(self, mock_client_class, mock_sleep):
+    async def test_fetch_500_retries_use_backoff(self, sleep_calls, httpx_mock, client_factory):
         """500 retries should sleep with exponential backoff, not fire back-to-back."""
-        mock_response = Mock()
-        mock_response.status_code = 500
-        mock_response.json.return_value = {"error": "Internal server error"}
-
-        mock_client = AsyncMock()
-        mock_client.post.side_effect = [mock_response, mock_response, mock_response]
-        mock_client_class.return_value = mock_client
+        httpx_mock.add_response(url=API_URL, status_code=500, json=_INTERNAL_ERROR_PAYLOAD, is_reusable=True)
 
         config = ChatAdsClientConfig(max_retries=3, backoff_seconds=0.5)
-        client = ChatAdsClient("mock_api_key_123", config)
+        client = client_factory("mock_api_key_123", config)
 
         with pytest.raises(ChatAdsAPIError):
             await client.fetch({"message": "test"})
 
-        # 3 attempts = 2 sleeps (between attempts 1→2 and 2→3)
-        assert mock_sleep.call_count == 2
-        # Exponential backoff: 0.5, then 1.0
-        mock_sleep.assert_any_call(0.5)
-        mock_sleep.assert_any_call(1.0)
+        # 3 attempts = 2 sleeps (between attempts 1→2 and 2→3), with exponential backoff
+        assert sleep_calls == [0.5, 1.0]
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_fetch_500_final_attempt_records_cb_failure(self, mock_client_class):
-        """Circuit breaker should record failure on every 500, including the final attempt."""
-        mock_response = Mock()
-        mock_response.status_code = 500
-        mock_response.json.return_value = {"error": "Internal server error"}
+    async def test_fetch_honors_retry_after_header(self, sleep_calls, httpx_mock, client_factory):
+        """A Retry-After header overrides the exponential backoff delay."""
+        httpx_mock.add_response(url=API_URL, status_code=429, headers={"retry-after": "2"})
+        httpx_mock.add_response(url=API_URL, json=_EMPTY_OK_PAYLOAD)
 
-        mock_client = AsyncMock()
-        mock_client.post.side_effect = [mock_response, mock_response]
-        mock_client_class.return_value = mock_client
+        config = ChatAdsClientConfig(max_retries=2, backoff_seconds=0.5)
+        client = client_factory("mock_api_key_123", config)
+        _, status_code, _ = await client.fetch({"message": "test"})
+
+        assert status_code == 200
+        assert sleep_calls == [2.0]
+
+    async def test_fetch_500_final_attempt_records_cb_failure(self, httpx_mock, client_factory):
+        """Circuit breaker should record failure on every 500, including the final attempt."""
+        httpx_mock.add_response(url=API_URL, status_code=500, json=_INTERNAL_ERROR_PAYLOAD, is_reusable=True)
 
         config = ChatAdsClientConfig(max_retries=2, backoff_seconds=0.0, enable_circuit_breaker=True)
-        client = ChatAdsClient("mock_api_key_123", config)
+        client = client_factory("mock_api_key_123", config)
 
         with pytest.raises(ChatAdsAPIError):
             await client.fetch({"message": "test"})
@@ -450,87 +630,63 @@ class TestRequestPayloadBuilding:
 
     def test_large_message_allowed(self):
         # Size validation removed - backend handles it
-        long_message = "word " * 400  # ~2000 chars (within limit)
         kwargs = {
-            "message": long_message,
+            "message": _MSG_LARGE_PAYLOAD,
             "ip": None,
             "country": None,
         }
         result = _build_request_payload(kwargs)
         # Note: _build_request_payload strips whitespace from message
-        assert result["message"] == long_message.strip()
+        assert result["message"] == _MSG_LARGE_PAYLOAD.strip()
 
 
 class TestCircuitBreaker:
     """Test circuit breaker functionality."""
 
-    def test_initial_state_closed(self):
-        cb = CircuitBreaker(failure_threshold=3, timeout_seconds=10)
-        assert cb.get_state() == CircuitState.CLOSED
-        assert cb.is_available() is True
-
-    def test_opens_after_threshold_failures(self):
-        cb = CircuitBreaker(failure_threshold=3, timeout_seconds=10)
-        cb.record_failure()
-        assert cb.get_state() == CircuitState.CLOSED
-        cb.record_failure()
-        assert cb.get_state() == CircuitState.CLOSED
-        cb.record_failure()
-        assert cb.get_state() == CircuitState.OPEN
-        assert cb.is_available() is False
-
-    def test_success_resets_failure_count(self):
+    @pytest.mark.parametrize(
+        "events,expected_state",
+        [
+            pytest.param([], CircuitState.CLOSED, id="initial_closed"),
+            pytest.param(["fail", "fail"], CircuitState.CLOSED, id="below_threshold"),
+            pytest.param(["fail", "fail", "fail"], CircuitState.OPEN, id="opens_at_threshold"),
+            pytest.param(
+                ["fail", "fail", "succeed", "fail", "fail"],
+                CircuitState.CLOSED,
+                id="success_resets_failure_count",
+            ),
+            pytest.param(["fail", "fail", "fail", "check"], CircuitState.OPEN, id="stays_open_before_timeout"),
+            pytest.param(
+                ["fail", "fail", "fail", "wait", "check"],
+                CircuitState.HALF_OPEN,
+                id="half_open_after_timeout",
+            ),
+            pytest.param(
+                ["fail", "fail", "fail", "wait", "check", "succeed"],
+                CircuitState.CLOSED,
+                id="half_open_closes_on_success",
+            ),
+            pytest.param(
+                ["fail", "fail", "fail", "wait", "check", "fail"],
+                CircuitState.OPEN,
+                id="half_open_reopens_on_failure",
+            ),
+        ],
+    )
+    def test_state_transitions(self, fake_clock, events, expected_state):
         cb = CircuitBreaker(failure_threshold=3, timeout_seconds=10)
-        cb.record_failure()
-        cb.record_failure()
-        assert cb.failure_count == 2
-        cb.record_success()
-        assert cb.failure_count == 0
-        assert cb.get_state() == CircuitState.CLOSED
-
-    def test_transitions_to_half_open_after_timeout(self):
-        cb = CircuitBreaker(failure_threshold=2, timeout_seconds=0.1)
-        cb.record_failure()
-        cb.record_failure()
-        assert cb.get_state() == CircuitState.OPEN
-        assert cb.is_available() is False
-
-        # Wait for timeout
-        import time
-
-        time.sleep(0.2)
-
-        # Should transition to HALF_OPEN
-        assert cb.is_available() is True
-        assert cb.get_state() == CircuitState.HALF_OPEN
-
-    def test_half_open_closes_on_success(self):
-        cb = CircuitBreaker(failure_threshold=2, timeout_seconds=0.1)
-        cb.record_failure()
-        cb.record_failure()
-        assert cb.get_state() == CircuitState.OPEN
-
-        import time
-
-        time.sleep(0.2)
-        cb.is_available()  # Transition to HALF_OPEN
-
-        cb.record_success()
-        assert cb.get_state() == CircuitState.CLOSED
-
-    def test_half_open_reopens_on_failure(self):
-        cb = CircuitBreaker(failure_threshold=2, timeout_seconds=0.1)
-        cb.record_failure()
-        cb.record_failure()
-        assert cb.get_state() == CircuitState.OPEN
-
-        import time
-
-        time.sleep(0.2)
-        cb.is_available()  # Transition to HALF_OPEN
+        actions = {
+            "fail": cb.record_failure,
+            "succeed": cb.record_success,
+            "check": cb.is_available,
+        }
+        for event in events:
+            if event == "wait":
+                fake_clock.now += cb.timeout_seconds
+            else:
+                actions[event]()
 
-        cb.record_failure()
-        assert cb.get_state() == CircuitState.OPEN
+        assert cb.get_state() == expected_state
+        assert cb.is_available() is (expected_state != CircuitState.OPEN)
 
 
 class TestQuotaWarnings:
@@ -586,54 +742,17 @@ class TestQuotaWarnings:
         assert warning is None
 
 
+@pytest.mark.usefixtures("_api_key_env", "_pooled_default_client")
 class TestIntegrationWithMockedHTTP:
     """Integration tests with mocked HTTP responses."""
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_successful_match_end_to_end(self, mock_client_class, monkeypatch):
+    async def test_successful_match_end_to_end(self, httpx_mock):
         """Test complete flow with successful product match."""
-        monkeypatch.setenv("CHATADS_API_KEY", "mock_api_key_test1234567890abcdef")
-
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "data": {
-                "status": "filled",
-                "offers": [
-                    {
-                        "link_text": "laptop",
-                        "url": "https://amazon.com/macbook-pro",
-                        "confidence_level": "high",
-                        "product": {
-                            "title": "MacBook Pro M3",
-                            "description": "Perfect for developers!",
-                        },
-                    }
-                ],
-                "requested": 1,
-                "returned": 1,
-            },
-            "error": None,
-            "meta": {
-                "request_id": "req_abc123",
-                "country": "US",
-                "usage": {
-                    "monthly_requests": 10,
-                    "free_tier_limit": 1000,
-                    "free_tier_remaining": 990,
-                    "daily_requests": 5,
-                    "daily_limit": 100,
-                    "is_free_tier": True,
-                },
-            },
-        }
-
-        mock_client = AsyncMock()
-        mock_client.post.return_value = mock_response
-        mock_client_class.return_value = mock_client
-
-        from chatads_mcp_wrapper import run_chatads_message_send
+        httpx_mock.add_response(
+            method="POST",
+            url=API_URL,
+            json=_SUCCESS_MATCH_PAYLOAD,
+        )
 
         result = await run_chatads_message_send("best laptop for coding")
 
@@ -643,136 +762,76 @@ class TestIntegrationWithMockedHTTP:
         assert result["offers"][0]["url"] == "https://amazon.com/macbook-pro"
         assert result["metadata"]["request_id"] == "req_abc123"
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_no_match_end_to_end(self, mock_client_class, monkeypatch):
+    async def test_no_match_end_to_end(self, httpx_mock):
         """Test complete flow with no match."""
-        monkeypatch.setenv("CHATADS_API_KEY", "mock_api_key_test1234567890abcdef")
-
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "data": {
-                "status": "no_offers_found",
-                "offers": [],
-                "requested": 1,
-                "returned": 0,
-            },
-            "error": None,
-            "meta": {"request_id": "req_xyz789"},
-        }
-
-        mock_client = AsyncMock()
-        mock_client.post.return_value = mock_response
-        mock_client_class.return_value = mock_client
-
-        from chatads_mcp_wrapper import run_chatads_message_send
+        httpx_mock.add_response(
+            method="POST",
+            url=API_URL,
+            json=_NO_MATCH_PAYLOAD,
+        )
 
         result = await run_chatads_message_send("random text here")
 
         assert result["status"] == "no_match"
         assert result["offers_returned"] == 0
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_quota_exceeded_end_to_end(self, mock_client_class, monkeypatch):
+    async def test_quota_exceeded_end_to_end(self, httpx_mock, sleep_calls):
         """Test complete flow with quota exceeded error."""
-        monkeypatch.setenv("CHATADS_API_KEY", "mock_api_key_test1234567890abcdef")
-
-        mock_response = Mock()
-        mock_response.status_code = 429
-        mock_response.json.return_value = {
-            "data": None,
-            "error": {
-                "code": "QUOTA_EXCEEDED",
-                "message": "Monthly quota reached",
-            },
-            "meta": {"request_id": "req_quota123"},
-        }
-
-        mock_client = AsyncMock()
-        mock_client.post.return_value = mock_response
-        mock_client_class.return_value = mock_client
-
-        from chatads_mcp_wrapper import run_chatads_message_send
+        httpx_mock.add_response(
+            method="POST",
+            url=API_URL,
+            status_code=429,
+            json=_QUOTA_EXCEEDED_PAYLOAD,
+            is_reusable=True,
+        )
 
         result = await run_chatads_message_send("best laptop")
 
         assert result["status"] == "error"
         assert result["error_code"] == "UPSTREAM_UNAVAILABLE"
-        assert "retryable error" in result["error_message"]
+        assert result["error_message"] == _EXPECTED_MSG_RETRYABLE
+        # Retries stop at the configured limit, doubling the backoff between attempts
+        assert len(httpx_mock.get_requests()) == chatads_module.DEFAULT_MAX_RETRIES
+        assert sleep_calls == [
+            chatads_module.BACKOFF_SECONDS * 2**attempt for attempt in range(chatads_module.DEFAULT_MAX_RETRIES - 1)
+        ]
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_network_timeout_with_retry(self, mock_client_class, monkeypatch):
+    async def test_network_timeout_with_retry(self, httpx_mock, sleep_calls):
         """Test retry logic on network timeout."""
-        monkeypatch.setenv("CHATADS_API_KEY", "mock_api_key_test1234567890abcdef")
-
-        mock_client = AsyncMock()
         # First two calls timeout, third succeeds
-        mock_client.post.side_effect = [
-            httpx.TimeoutException("Timeout"),
-            httpx.TimeoutException("Timeout"),
-            Mock(
-                status_code=200,
-                json=lambda: {
-                    "data": {"status": "no_offers_found", "offers": [], "requested": 1, "returned": 0},
-                    "error": None,
-                    "meta": {"request_id": "req_retry"},
-                },
-            ),
-        ]
-        mock_client_class.return_value = mock_client
-
-        from chatads_mcp_wrapper import run_chatads_message_send
+        httpx_mock.add_exception(httpx.TimeoutException("Timeout"), url=API_URL)
+        httpx_mock.add_exception(httpx.TimeoutException("Timeout"), url=API_URL)
+        httpx_mock.add_response(
+            url=API_URL,
+            json=_NO_MATCH_PAYLOAD,
+        )
 
         result = await run_chatads_message_send("test message")
 
         assert result["status"] == "no_match"
-        assert mock_client.post.call_count == 3  # Retried twice, succeeded on third
+        assert len(httpx_mock.get_requests()) == 3  # Retried twice, succeeded on third
+        assert sleep_calls == [chatads_module.BACKOFF_SECONDS, chatads_module.BACKOFF_SECONDS * 2]
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_invalid_api_key_end_to_end(self, mock_client_class, monkeypatch):
+    async def test_invalid_api_key_end_to_end(self, httpx_mock):
         """Test flow with invalid API key."""
-        monkeypatch.setenv("CHATADS_API_KEY", "mock_api_key_test1234567890abcdef")
-
-        mock_response = Mock()
-        mock_response.status_code = 403
-        mock_response.json.return_value = {
-            "data": None,
-            "error": {
-                "code": "FORBIDDEN",
-                "message": "Invalid API key",
-            },
-            "meta": {"request_id": "req_forbidden"},
-        }
-
-        mock_client = AsyncMock()
-        mock_client.post.return_value = mock_response
-        mock_client_class.return_value = mock_client
-
-        from chatads_mcp_wrapper import run_chatads_message_send
+        httpx_mock.add_response(
+            method="POST",
+            url=API_URL,
+            status_code=403,
+            json=_FORBIDDEN_PAYLOAD,
+        )
 
         result = await run_chatads_message_send("test message")
 
         assert result["status"] == "error"
         assert result["error_code"] == "FORBIDDEN"
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_invalid_input_fails_before_api_call(self, mock_client_class, monkeypatch):
+    async def test_invalid_input_fails_before_api_call(self, httpx_mock):
         """Test that empty message validation errors don't make API calls.
 
         Note: Client-side validation only checks for empty message and api_key.
         Other validation (country format, etc.) is done server-side.
         """
-        monkeypatch.setenv("CHATADS_API_KEY", "mock_api_key_test1234567890abcdef")
-
-        mock_client = AsyncMock()
-        mock_client_class.return_value = mock_client
-
-        from chatads_mcp_wrapper import run_chatads_message_send
 
         # Empty message should fail client-side validation
         result = await run_chatads_message_send("")
@@ -780,48 +839,55 @@ class TestIntegrationWithMockedHTTP:
         assert result["status"] == "error"
         assert result["error_code"] == "INVALID_INPUT"
         # API should NOT have been called
-        assert mock_client.post.call_count == 0
+        assert httpx_mock.get_requests() == []
 
-    @pytest.mark.asyncio
     async def test_missing_api_key(self, monkeypatch):
         """Test that missing API key fails gracefully."""
         monkeypatch.delenv("CHATADS_API_KEY", raising=False)
 
-        from chatads_mcp_wrapper import run_chatads_message_send
-
         result = await run_chatads_message_send("test message")
 
         assert result["status"] == "error"
         assert result["error_code"] == "CONFIGURATION_ERROR"
-        assert "API key" in result["error_message"]
+        assert result["error_message"] == _EXPECTED_MSG_NO_API_KEY
 
-    @pytest.mark.asyncio
-    @patch("chatads_mcp_wrapper.httpx.AsyncClient")
-    async def test_server_error_with_retry(self, mock_client_class, monkeypatch):
+    async def test_server_error_with_retry(self, httpx_mock, sleep_calls):
         """Test retry logic on 500 server errors."""
-        monkeypatch.setenv("CHATADS_API_KEY", "mock_api_key_test1234567890abcdef")
-
-        mock_client = AsyncMock()
         # First call returns 500, second succeeds
-        mock_client.post.side_effect = [
-            Mock(status_code=500, json=lambda: {"data": None, "error": {"code": "INTERNAL_ERROR", "message": "Internal Server Error"}}),
-            Mock(
-                status_code=200,
-                json=lambda: {
-                    "data": {"status": "no_offers_found", "offers": [], "requested": 1, "returned": 0},
-                    "error": None,
-                    "meta": {"request_id": "req_500"},
-                },
-            ),
-        ]
-        mock_client_class.return_value = mock_client
-
-        from chatads_mcp_wrapper import run_chatads_message_send
+        httpx_mock.add_response(
+            url=API_URL,
+            status_code=500,
+            json=_INTERNAL_ERROR_PAYLOAD,
+        )
+        httpx_mock.add_response(
+            url=API_URL,
+            json=_NO_MATCH_PAYLOAD,
+        )
 
         result = await run_chatads_message_send("test message")
 
         assert result["status"] == "no_match"
-        assert mock_client.post.call_count == 2  # Retried once
+        assert len(httpx_mock.get_requests()) == 2  # Retried once
+        assert sleep_calls == [chatads_module.BACKOFF_SECONDS]
+
+
+class TestPerformanceGuards:
+    """Guard hot paths against regressions that only show up as slowdowns."""
+
+    def test_no_regex_recompile_in_hot_paths(self):
+        """Validation and log sanitization must only use module-level compiled patterns.
+
+        A ``re.match(pattern_str, ...)`` or ``re.compile`` inside these functions would
+        populate the ``re`` module cache on first call.
+        """
+        re.purge()
+        for i in range(1000):
+            _validate_inputs(f"word{i} word{i}")
+            _sanitize_error_for_logging(Exception(f"GET https://api.example.com/v{i}?key=secret failed"))
+            with pytest.raises(ChatAdsAPIError):
+                _validate_inputs(" " * (i % 3))
+        assert len(re._cache) == 0
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--cov=chatads_mcp_wrapper", "--cov-report=term-missing"])
@@ -11,104 +11,167 @@ Usage:
 """
 
 import asyncio
+import io
 import os
+import statistics
 import sys
+import time
 
 from chatads_mcp_wrapper import run_chatads_message_send
 
-async def test_basic_lookup():
+# Scaled query count for the script's concurrency check (override with
+# CHATADS_LIVE_CONCURRENCY). Each live query counts against the API key's quota,
+# so lower this on free-tier keys; pytest runs only the small default sample.
+DEFAULT_CONCURRENT_QUERIES = 32
+QUERY_ROTATION = (
+    "best laptop",
+    "best headphones",
+    "best monitor",
+    "best keyboard",
+)
+
+# Cap on in-flight requests in test_concurrent so large query counts queue locally
+# instead of exhausting the connection pool or tripping server-side 503 backoff.
+MAX_INFLIGHT = 10
+
+# Warm sequential calls timed for test_concurrent's baseline (median is used)
+BASELINE_SAMPLES = 3
+
+
+def concurrent_queries_from_env():
+    """Parse CHATADS_LIVE_CONCURRENCY at call time so a bad value never breaks import."""
+    raw = os.getenv("CHATADS_LIVE_CONCURRENCY", str(DEFAULT_CONCURRENT_QUERIES))
+    try:
+        count = int(raw)
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise ValueError(f"CHATADS_LIVE_CONCURRENCY must be an integer >= 1, got {raw!r}")
+    return count
+
+
+async def test_basic_lookup(out=None):
     """Test 2: Basic affiliate lookup."""
-    print("🔍 Test 2: Basic Affiliate Lookup")
-    print("-" * 50)
+    print("🔍 Test 2: Basic Affiliate Lookup", file=out)
+    print("-" * 50, file=out)
 
     result = await run_chatads_message_send(
         message="best laptop for coding"
     )
 
-    print(f"Status: {result['status']}")
+    print(f"Status: {result['status']}", file=out)
     offers = result.get('offers', [])
-    print(f"Offers returned: {len(offers)}")
+    print(f"Offers returned: {len(offers)}", file=out)
 
     if result['status'] == 'error':
-        print(f"❌ Error: {result['error_code']}")
-        print(f"   Message: {result['error_message']}")
+        print(f"❌ Error: {result['error_code']}", file=out)
+        print(f"   Message: {result['error_message']}", file=out)
         return False
 
     if offers:
         offer = offers[0]
         product = offer.get('product') or {}
-        print(f"✅ Product: {product.get('Title', 'N/A')}")
-        print(f"   Link text: {offer.get('link_text', 'N/A')}")
+        print(f"✅ Product: {product.get('Title', 'N/A')}", file=out)
+        print(f"   Link text: {offer.get('link_text', 'N/A')}", file=out)
         url = offer.get('url', 'N/A')
-        print(f"   URL: {url[:60] if url else 'N/A'}...")
+        print(f"   URL: {url[:60] if url else 'N/A'}...", file=out)
     else:
-        print(f"ℹ️ No offers: {result.get('reason', 'N/A')}")
+        print(f"ℹ️ No offers: {result.get('reason', 'N/A')}", file=out)
 
-    print(f"\n📊 Metadata:")
-    print(f"   Request ID: {result['metadata']['request_id']}")
-    print(f"   Latency: {result['metadata']['latency_ms']:.2f}ms")
+    print(f"\n📊 Metadata:", file=out)
+    print(f"   Request ID: {result['metadata']['request_id']}", file=out)
+    print(f"   Latency: {result['metadata']['latency_ms']:.2f}ms", file=out)
 
     if result['metadata'].get('usage_summary'):
         usage = result['metadata']['usage_summary']
-        print(f"\n💰 Usage:")
-        print(f"   Monthly: {usage['monthly']['used']}/{usage['monthly']['limit']}")
-        print(f"   Daily: {usage['daily']['used']}/{usage['daily']['limit']}")
+        print(f"\n💰 Usage:", file=out)
+        print(f"   Monthly: {usage['monthly']['used']}/{usage['monthly']['limit']}", file=out)
+        print(f"   Daily: {usage['daily']['used']}/{usage['daily']['limit']}", file=out)
 
-    print()
+    print(file=out)
     return True
 
 
-async def test_concurrent():
-    """Test 3: Concurrent requests (show async power!)."""
-    print("⚡ Test 3: Concurrent Requests")
-    print("-" * 50)
+async def test_concurrent(out=None, count=None):
+    """Test 3: Concurrent requests (show async power!).
+
+    By default fires a small 3-query sample. When ``count`` is given (the script
+    passes the scaled CHATADS_LIVE_CONCURRENCY value), fires that many requests and
+    fails if throughput does not beat a sequential baseline: the median latency
+    of BASELINE_SAMPLES warm calls.
+    """
+    print("⚡ Test 3: Concurrent Requests", file=out)
+    print("-" * 50, file=out)
+
+    scaled = count is not None
+    if not scaled:
+        count = 3
+    queries = [QUERY_ROTATION[i % len(QUERY_ROTATION)] for i in range(count)]
 
-    queries = [
-        "best laptop",
-        "best headphones",
-        "best monitor",
-    ]
+    sequential_throughput = None
+    if scaled:
+        # Untimed warm-up call opens the pooled connection, so TCP+TLS setup does not
+        # inflate the baseline; then time a few sequential calls on the warm connection.
+        await run_chatads_message_send(message=queries[0])
+        samples_ms = []
+        for query in QUERY_ROTATION[:BASELINE_SAMPLES]:
+            start_ns = time.perf_counter_ns()
+            await run_chatads_message_send(message=query)
+            samples_ms.append((time.perf_counter_ns() - start_ns) / 1_000_000)
+        sequential_throughput = 1000 / statistics.median(samples_ms)
 
-    import time
-    start = time.perf_counter()
+    inflight = asyncio.Semaphore(MAX_INFLIGHT)
+
+    async def bounded_send(query):
+        async with inflight:
+            return await run_chatads_message_send(message=query)
+
+    start_ns = time.perf_counter_ns()
 
     results = await asyncio.gather(*[
-        run_chatads_message_send(message=q)
+        bounded_send(q)
         for q in queries
     ])
 
-    elapsed = (time.perf_counter() - start) * 1000
+    elapsed = (time.perf_counter_ns() - start_ns) / 1_000_000
+    throughput = len(results) / (elapsed / 1000)
 
-    print(f"Processed {len(results)} queries in {elapsed:.0f}ms")
-    print(f"Average: {elapsed / len(results):.0f}ms per query")
-    print(f"Throughput: {len(results) / (elapsed / 1000):.1f} req/s\n")
+    print(f"Processed {len(results)} queries in {elapsed:.0f}ms", file=out)
+    print(f"Average: {elapsed / len(results):.0f}ms per query", file=out)
+    if scaled:
+        print(f"Throughput: {throughput:.1f} req/s (sequential baseline: {sequential_throughput:.1f} req/s)\n", file=out)
+    else:
+        print(f"Throughput: {throughput:.1f} req/s\n", file=out)
 
     for i, (query, result) in enumerate(zip(queries, results), 1):
         offers = result.get('offers') or []
         has_offers = len(offers) > 0
         status = "✅" if has_offers else "❌"
-        print(f"{i}. {status} {query} - {result['status']}")
+        print(f"{i}. {status} {query} - {result['status']}", file=out)
 
-    print()
+    print(file=out)
+    if scaled and throughput < sequential_throughput:
+        print("❌ Concurrent throughput fell below the sequential baseline\n", file=out)
+        return False
     return True
 
 
-async def test_error_handling():
+async def test_error_handling(out=None):
     """Test 4: Error handling."""
-    print("🛡️ Test 4: Error Handling")
-    print("-" * 50)
+    print("🛡️ Test 4: Error Handling", file=out)
+    print("-" * 50, file=out)
 
     # Test with invalid input (too short)
     result = await run_chatads_message_send(message="x")
 
     if result['status'] == 'error':
-        print(f"✅ Correctly caught validation error:")
-        print(f"   Code: {result['error_code']}")
-        print(f"   Message: {result['error_message']}")
+        print(f"✅ Correctly caught validation error:", file=out)
+        print(f"   Code: {result['error_code']}", file=out)
+        print(f"   Message: {result['error_message']}", file=out)
     else:
-        print(f"⚠️ Expected error but got: {result['status']}")
+        print(f"⚠️ Expected error but got: {result['status']}", file=out)
 
-    print()
+    print(file=out)
     return True
 
 
@@ -127,16 +190,39 @@ async def main():
         print()
         sys.exit(1)
 
+    try:
+        concurrent_queries = concurrent_queries_from_env()
+    except ValueError as exc:
+        print(f"❌ ERROR: {exc}")
+        print()
+        sys.exit(1)
+
     api_key = os.getenv("CHATADS_API_KEY")
     print(f"Using API Key: {api_key[:15]}...")
     print()
 
     try:
-        # Run tests
+        # The lookup and error-handling checks are independent, so run them together
+        # and replay each one's buffered output in order to keep the logs readable.
+        buffers = [io.StringIO(), io.StringIO()]
+        results = await asyncio.gather(
+            test_basic_lookup(buffers[0]),
+            test_error_handling(buffers[1]),
+            return_exceptions=True,
+        )
         success = True
-        success = await test_basic_lookup() and success
-        success = await test_concurrent() and success
-        success = await test_error_handling() and success
+        for buffer, result in zip(buffers, results):
+            sys.stdout.write(buffer.getvalue())
+            if isinstance(result, BaseException):
+                print(f"❌ Unexpected error: {result}\n")
+                result = False
+            success = result and success
+
+        # Run on its own so the throughput numbers are not skewed by the other checks;
+        # its per-query lines are buffered too and written out in one call.
+        buffer = io.StringIO()
+        success = await test_concurrent(buffer, count=concurrent_queries) and success
+        sys.stdout.write(buffer.getvalue())
 
         # Summary
         print("=" * 50)
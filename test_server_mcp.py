@@ -14,21 +14,44 @@ Usage:
 """
 
 import asyncio
-import json
 import os
+import re
 import sys
 from pathlib import Path
 
 import httpx
 
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]"); fall back to HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# orjson's C parser is a drop-in for json.loads on the tool-call payload; fall back to stdlib json
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+# python-dotenv handles quoted values and `export` prefixes; fall back to a minimal parser
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+# Fallback .env parser: one regex pass over the whole file. Comment lines never match because
+# keys must start with a letter or underscore; [ \t] keeps an empty value from spilling onto the next line.
+ENV_LINE_PATTERN = re.compile(r"^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t]*$", re.M)
+
 # Load .env file if it exists
 env_file = Path(__file__).parent / ".env"
-if env_file.exists():
-    for line in env_file.read_text().splitlines():
-        line = line.strip()
-        if line and not line.startswith("#") and "=" in line:
-            key, value = line.split("=", 1)
-            os.environ.setdefault(key.strip(), value.strip())
+if load_dotenv is not None:
+    load_dotenv(env_file, override=False)
+elif env_file.exists():
+    for key, value in ENV_LINE_PATTERN.findall(env_file.read_text()):
+        os.environ.setdefault(key, value)
 
 MCP_SERVER_URL = "https://api.getchatads.com/mcp/mcp"
 
@@ -47,7 +70,12 @@ async def test_mcp_server():
     print(f"API Key: {api_key[:15]}...")
     print()
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    # One pooled client for the whole session so every call reuses the same connection
+    async with httpx.AsyncClient(
+        timeout=30.0,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=30),
+    ) as client:
         # Test 1: Initialize session
         print("1. Initialize MCP session...")
         init_response = await client.post(
@@ -89,19 +117,38 @@ async def test_mcp_server():
         if session_id:
             headers["mcp-session-id"] = session_id
 
-        # Test 2: List tools
-        print("\n2. List available tools...")
-        tools_response = await client.post(
-            MCP_SERVER_URL,
-            headers=headers,
-            json={
-                "jsonrpc": "2.0",
-                "id": 2,
-                "method": "tools/list",
-                "params": {},
-            },
+        # tools/list and tools/call only depend on the session, not on each other, so
+        # fire them together; over HTTP/2 both are multiplexed on one connection.
+        tools_response, call_response = await asyncio.gather(
+            client.post(
+                MCP_SERVER_URL,
+                headers=headers,
+                json={
+                    "jsonrpc": "2.0",
+                    "id": 2,
+                    "method": "tools/list",
+                    "params": {},
+                },
+            ),
+            client.post(
+                MCP_SERVER_URL,
+                headers=headers,
+                json={
+                    "jsonrpc": "2.0",
+                    "id": 3,
+                    "method": "tools/call",
+                    "params": {
+                        "name": "chatads_message_send",
+                        "arguments": {
+                            "message": "I need a good standing desk for my home office",
+                        },
+                    },
+                },
+            ),
         )
 
+        # Test 2: List tools
+        print("\n2. List available tools...")
         if tools_response.status_code != 200:
             print(f"   FAIL: HTTP {tools_response.status_code}")
             return False
@@ -114,22 +161,6 @@ async def test_mcp_server():
 
         # Test 3: Call chatads_message_send
         print("\n3. Call chatads_message_send...")
-        call_response = await client.post(
-            MCP_SERVER_URL,
-            headers=headers,
-            json={
-                "jsonrpc": "2.0",
-                "id": 3,
-                "method": "tools/call",
-                "params": {
-                    "name": "chatads_message_send",
-                    "arguments": {
-                        "message": "I need a good standing desk for my home office",
-                    },
-                },
-            },
-        )
-
         if call_response.status_code != 200:
             print(f"   FAIL: HTTP {call_response.status_code}")
             print(f"   Response: {call_response.text[:500]}")
@@ -147,7 +178,7 @@ async def test_mcp_server():
             # Parse the text content
             text_content = content[0].get("text", "{}")
             try:
-                parsed = json.loads(text_content)
+                parsed = _json.loads(text_content)
                 offers = parsed.get("data", {}).get("Offers", [])
                 print(f"   OK: Got {len(offers)} offer(s)")
                 if offers:
@@ -155,7 +186,7 @@ async def test_mcp_server():
                     product = offer.get("Product", {})
                     print(f"       Product: {product.get('Title', 'N/A')[:60]}...")
                     print(f"       URL: {offer.get('URL', 'N/A')[:60]}...")
-            except json.JSONDecodeError:
+            except _json.JSONDecodeError:
                 print(f"   OK: Got response (non-JSON)")
                 print(f"       {text_content[:100]}...")
         else: